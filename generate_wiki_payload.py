@@ -55,7 +55,7 @@ payload = {
     "authorId": "Auto_Archivist"
 }
 
-with open("wiki_payload.json", "w") as f:
-    json.dump(payload, f)
+with open("wiki_payload.json", "w", encoding="utf-8", buffering=1 << 16) as f:
+    json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
 
 print("JSON payload generated successfully.")
@@ -1,6 +1,22 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+import numpy as np
 from PIL import Image, ImageDraw
 from pathlib import Path
-from collections import deque
+
+try:
+    from scipy import ndimage
+except ImportError:  # fall back to the numba flood-fill below
+    ndimage = None
+    from numba import njit
 
 ROOT = Path('/Users/tommy/clawd/generative-agents-ts')
 ASSET_DIR = ROOT / 'public' / 'static' / 'assets' / 'npc'
@@ -12,121 +28,329 @@ SOURCES = {
 
 CANVAS = (32, 32)
 TARGET_H = 30
+# at a 30px target lanczos buys nothing visible over bilinear and costs several times more
+RESAMPLE = Image.Resampling.BILINEAR
 
-# subtle walk bob only, preserve full body silhouette
-OFFSETS = [
+# zlib level dominates runtime on 32x32 frames; --ship trades time for size
+PNG_FAST = {'compress_level': 1, 'optimize': False}
+PNG_SHIP = {'compress_level': 9, 'optimize': True}
+
+# subtlebob: subtle walk bob only, preserve full body silhouette
+# one (dx, dy) row per frame
+OFFSETS = np.array([
     (0, 0),
     (1, -1),
     (0, 0),
     (-1, -1),
-]
+], dtype=np.int8)
+
+# legbob: same walk phase as generate-npc-walk-frames.mjs. Legs swing apart on
+# frames 0/2 (left -1/+1, right +1/-1) and pass on frames 1/3. There the mjs
+# drops the legs one row; with feet pinned to the canvas bottom, raising the
+# body one row gives the same body/leg separation.
+# LEG_SPLIT is where the legs start as a fraction of sprite height: in the mjs
+# figure (rows 3-21) they start at row 17, (17 - 3) / 19 ~= 0.74.
+LEG_SPLIT = 0.74
+BOB = [0, -1, 0, -1]
+LEFT_DX = [-1, 0, 1, 0]
+RIGHT_DX = [1, 0, -1, 0]
+# one (bob, left_dx, right_dx) row per frame
+LEGBOB_OFFSETS = np.array(list(zip(BOB, LEFT_DX, RIGHT_DX)), dtype=np.int8)
+
+# soft shadow, rasterized once per run and blitted at (10 + dx, 27) in every frame
+SHADOW = Image.new('RGBA', (13, 5), (0, 0, 0, 0))
+ImageDraw.Draw(SHADOW).ellipse((0, 0, 12, 4), fill=(30, 42, 30, 105))
 
 
-def is_bg_pixel(r: int, g: int, b: int) -> bool:
+# 4-connectivity, matching the old BFS neighbour set
+FOUR_CONN = np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]], dtype=bool)
+
+
+def bg_candidate(rgba: np.ndarray) -> np.ndarray:
     # near-white background only
-    if r < 220 or g < 220 or b < 220:
-        return False
-    return (max(r, g, b) - min(r, g, b)) <= 24
-
-
-def remove_border_background(img: Image.Image) -> Image.Image:
-    rgb = img.convert('RGB')
-    w, h = rgb.size
-    px = rgb.load()
-
-    bg = [[False for _ in range(w)] for _ in range(h)]
-    q = deque()
-
-    def push_if_bg(x: int, y: int):
-        if x < 0 or y < 0 or x >= w or y >= h:
-            return
-        if bg[y][x]:
-            return
-        r, g, b = px[x, y]
-        if not is_bg_pixel(r, g, b):
-            return
-        bg[y][x] = True
-        q.append((x, y))
+    r, g, b = rgba[..., 0], rgba[..., 1], rgba[..., 2]
+    mx = np.maximum(np.maximum(r, g), b)
+    mn = np.minimum(np.minimum(r, g), b)
+    # mn >= 220 covers all three channel checks; mx >= mn, so the uint8 spread can't wrap
+    return (mn >= 220) & ((mx - mn) <= 24)
 
-    # seed from borders only, so inner whites on character are preserved
-    for x in range(w):
-        push_if_bg(x, 0)
-        push_if_bg(x, h - 1)
-    for y in range(h):
-        push_if_bg(0, y)
-        push_if_bg(w - 1, y)
-
-    while q:
-        x, y = q.popleft()
-        push_if_bg(x + 1, y)
-        push_if_bg(x - 1, y)
-        push_if_bg(x, y + 1)
-        push_if_bg(x, y - 1)
-
-    rgba = rgb.convert('RGBA')
-    out = rgba.load()
-    for y in range(h):
+
+if ndimage is None:
+
+    @njit(cache=True)
+    def _push_if_bg(arr, out, stack, sp, x, y):
+        h, w = out.shape
+        if x < 0 or y < 0 or x >= w or y >= h or out[y, x]:
+            return sp
+        r, g, b = arr[y, x, 0], arr[y, x, 1], arr[y, x, 2]
+        if r < 220 or g < 220 or b < 220:
+            return sp
+        if max(r, g, b) - min(r, g, b) > 24:
+            return sp
+        out[y, x] = True
+        stack[sp] = y
+        stack[sp + 1] = x
+        return sp + 2
+
+    @njit(cache=True)
+    def fill(arr, out):
+        h, w = out.shape
+        # every pixel is pushed at most once, so H*W (y, x) pairs always fit
+        stack = np.empty(h * w * 2, np.int32)
+        sp = 0
         for x in range(w):
-            r, g, b, _ = out[x, y]
-            if bg[y][x]:
-                out[x, y] = (r, g, b, 0)
-            else:
-                out[x, y] = (r, g, b, 255)
+            sp = _push_if_bg(arr, out, stack, sp, x, 0)
+            sp = _push_if_bg(arr, out, stack, sp, x, h - 1)
+        for y in range(h):
+            sp = _push_if_bg(arr, out, stack, sp, 0, y)
+            sp = _push_if_bg(arr, out, stack, sp, w - 1, y)
+        while sp > 0:
+            sp -= 2
+            y = stack[sp]
+            x = stack[sp + 1]
+            sp = _push_if_bg(arr, out, stack, sp, x + 1, y)
+            sp = _push_if_bg(arr, out, stack, sp, x - 1, y)
+            sp = _push_if_bg(arr, out, stack, sp, x, y + 1)
+            sp = _push_if_bg(arr, out, stack, sp, x, y - 1)
+
+
+def border_background_mask(a: np.ndarray) -> np.ndarray:
+    # seed from borders only, so inner whites on character are preserved
+    if ndimage is None:
+        out = np.zeros(a.shape[:2], np.bool_)
+        fill(np.ascontiguousarray(a), out)
+        return out
+
+    lab, _ = ndimage.label(bg_candidate(a), structure=FOUR_CONN)
+    border_ids = np.unique(np.concatenate([lab[0], lab[-1], lab[:, 0], lab[:, -1]]))
+    return np.isin(lab, border_ids[border_ids != 0])
+
+
+def with_alpha(src: np.ndarray, alpha: np.ndarray) -> np.ndarray:
+    # src is read-only, so RGB + alpha go into a fresh output buffer
+    out = np.empty_like(src)
+    out[..., :3] = src[..., :3]
+    out[..., 3] = alpha
+    return out
+
+
+def remove_border_background(img: Image.Image) -> np.ndarray:
+    src = np.asarray(img.convert('RGBA'))  # read-only copy; skips np.array's second copy
+    bg = border_background_mask(src)
+    return with_alpha(src, np.where(bg, 0, 255).astype(np.uint8))
+
 
-    return rgba
+def white_to_alpha(img: Image.Image) -> np.ndarray:
+    # keys out every near-white pixel, with a soft ramp on the anti-aliased edge
+    src = np.asarray(img.convert('RGBA'))  # read-only copy; skips np.array's second copy
+    r, g, b = src[..., 0], src[..., 1], src[..., 2]
+    white = (r > 250) & (g > 250) & (b > 250)
+    soft = (~white) & (r > 238) & (g > 238) & (b > 238)
+    mean = (r.astype(np.int16) + g + b) // 3
 
+    alpha = np.full(r.shape, 255, np.uint8)
+    alpha[soft] = np.clip((250 - mean[soft]) * 28, 0, 255).astype(np.uint8)
+    alpha[white] = 0
+    return with_alpha(src, alpha)
 
-def crop_alpha(img: Image.Image, pad: int = 2) -> Image.Image:
-    alpha = img.getchannel('A')
-    bbox = alpha.getbbox()
-    if not bbox:
+
+BG_MODES = {
+    'border': remove_border_background,
+    'white': white_to_alpha,
+}
+
+
+def crop_alpha(arr: np.ndarray, pad: int = 2) -> np.ndarray:
+    ys, xs = np.where(arr[..., 3] > 0)
+    if ys.size == 0:
+        return arr
+    h, w = arr.shape[:2]
+    t = max(0, ys.min() - pad)
+    b = min(h, ys.max() + 1 + pad)
+    l = max(0, xs.min() - pad)
+    r = min(w, xs.max() + 1 + pad)
+    return arr[t:b, l:r]
+
+
+def to_palette(img: Image.Image) -> Image.Image:
+    # PNG8 + tRNS is smaller and cheaper to encode than RGBA. Frames rarely exceed
+    # 256 colors, so index them exactly; otherwise keep RGBA rather than quantize,
+    # which shifts the soft shadow/edge alpha.
+    packed = np.ascontiguousarray(np.asarray(img)).view('<u4')[..., 0]
+    palette, idx = np.unique(packed, return_inverse=True)
+    if palette.size > 256:
         return img
-    l, t, r, b = bbox
-    l = max(0, l - pad)
-    t = max(0, t - pad)
-    r = min(img.width, r + pad)
-    b = min(img.height, b + pad)
-    return img.crop((l, t, r, b))
-
-
-def prep_sprite(src_path: Path) -> Image.Image:
-    src = Image.open(src_path)
-    no_bg = remove_border_background(src)
-    cropped = crop_alpha(no_bg, 2)
-    tw = max(1, int(cropped.width * (TARGET_H / cropped.height)))
-    resized = cropped.resize((tw, TARGET_H), Image.Resampling.LANCZOS)
+    out = Image.fromarray(idx.reshape(packed.shape).astype(np.uint8), 'P')
+    out.putpalette(palette.view(np.uint8).tobytes(), 'RGBA')
+    return out
+
+
+# accumulates wall time per pipeline stage; printed by --profile
+class StageTimer:
+    def __init__(self):
+        self.times: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0.0) + time.perf_counter() - t0
+
+    def report(self, label: str):
+        total = sum(self.times.values()) or 1.0
+        print(f'{label}:')
+        for name, secs in self.times.items():
+            print(f'  {name:<10} {secs * 1000:8.2f} ms  {secs / total:6.1%}')
+
+
+def prep_sprite(src_path: Path, bg_mode: str = 'border', timer: StageTimer | None = None) -> Image.Image:
+    timer = timer or StageTimer()
+    with timer.stage('decode'):
+        src = Image.open(src_path)
+        src.load()
+    with timer.stage('bg'):
+        no_bg = BG_MODES[bg_mode](src)
+        cropped = Image.fromarray(crop_alpha(no_bg, 2), 'RGBA')
+    with timer.stage('resize'):
+        tw = max(1, int(cropped.width * (TARGET_H / cropped.height)))
+        resized = cropped.resize((tw, TARGET_H), RESAMPLE)
     return resized
 
 
-def compose_walk_frames(name: str, sprite: Image.Image):
+def compose_walk_frames(
+    name: str,
+    sprite: Image.Image,
+    offsets: np.ndarray,
+    split: float | None = None,
+    png_opts: dict = PNG_FAST,
+    timer: StageTimer | None = None,
+    strip: bool = False,
+):
+    # without split, offsets are (dx, dy) for the whole sprite;
+    # with split, offsets are (bob, left_dx, right_dx) for body / left leg / right leg
+    timer = timer or StageTimer()
     sw, sh = sprite.size
     base_x = (CANVAS[0] - sw) // 2
     base_y = CANVAS[1] - sh
 
-    for i, (dx, dy) in enumerate(OFFSETS):
-        frame = Image.new('RGBA', CANVAS, (0, 0, 0, 0))
+    with timer.stage('composite'):
+        if split is not None:
+            leg_y = int(sh * split)
+            body = sprite.crop((0, 0, sw, leg_y))
+            left_leg = sprite.crop((0, leg_y, sw // 2, sh))
+            right_leg = sprite.crop((sw // 2, leg_y, sw, sh))
+            # body's bottom row, repeated into the gap a raised body leaves above the legs
+            seam = sprite.crop((0, leg_y - 1, sw, leg_y))
+
+        # tolist() unpacks the whole table to Python ints in one call, so the
+        # PIL offsets below never do int8 arithmetic
+        frames = []
+        for i, offs in enumerate(offsets.tolist()):
+            frame = Image.new('RGBA', CANVAS, (0, 0, 0, 0))
 
-        # soft shadow
-        shadow = Image.new('RGBA', CANVAS, (0, 0, 0, 0))
-        d = ImageDraw.Draw(shadow)
-        d.ellipse((10 + dx, 27, 22 + dx, 31), fill=(30, 42, 30, 105))
-        frame.alpha_composite(shadow)
+            if split is None:
+                dx, dy = offs
+                frame.alpha_composite(SHADOW, (10 + dx, 27))
+                frame.alpha_composite(sprite, (base_x + dx, base_y + dy))
+            else:
+                bob, ldx, rdx = offs
+                frame.alpha_composite(SHADOW, (10, 27))
+                frame.alpha_composite(left_leg, (base_x + ldx, base_y + leg_y))
+                frame.alpha_composite(right_leg, (base_x + sw // 2 + rdx, base_y + leg_y))
+                frame.alpha_composite(body, (base_x, base_y + bob))
+                # only fills rows nothing else covers, so no pixel is composited twice
+                for gap_y in range(leg_y + bob, leg_y):
+                    frame.alpha_composite(seam, (base_x, base_y + gap_y))
 
-        frame.alpha_composite(sprite, (base_x + dx, base_y + dy))
+            frames.append(frame)
 
-        out = ASSET_DIR / f'{name}_walk_{i}.png'
-        frame.save(out, format='PNG')
+    # the game loads <name>_walk_<i>.png (same names as generate-npc-walk-frames.mjs)
+    with timer.stage('encode'):
+        for i, frame in enumerate(frames):
+            out = ASSET_DIR / f'{name}_walk_{i}.png'
+            to_palette(frame).save(out, format='PNG', **png_opts)
+            print('wrote', out)
+
+    if strip:
+        # opt-in horizontal strip + frame meta, for when the loader binds one texture per NPC
+        with timer.stage('encode'):
+            sheet = Image.new('RGBA', (CANVAS[0] * len(frames), CANVAS[1]), (0, 0, 0, 0))
+            for i, frame in enumerate(frames):
+                sheet.paste(frame, (i * CANVAS[0], 0))
+            out = ASSET_DIR / f'{name}_walk.png'
+            to_palette(sheet).save(out, format='PNG', **png_opts)
+        meta = ASSET_DIR / f'{name}_walk.json'
+        meta.write_text(json.dumps({'frame_w': CANVAS[0], 'frame_h': CANVAS[1], 'count': len(frames)}))
         print('wrote', out)
 
 
+def process_one(
+    job: tuple[str, Path],
+    bg_mode: str,
+    offsets: np.ndarray,
+    split: float | None,
+    png_opts: dict,
+    strip: bool,
+) -> tuple[str, StageTimer]:
+    name, path = job
+    timer = StageTimer()
+    sprite = prep_sprite(path, bg_mode, timer)
+    compose_walk_frames(name, sprite, offsets, split, png_opts, timer, strip)
+    return name, timer
+
+
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--style', choices=['subtlebob', 'legbob'], default='subtlebob')
+    parser.add_argument('--bg-mode', choices=sorted(BG_MODES), default='border')
+    parser.add_argument('--ship', action='store_true', help='max PNG compression for distribution')
+    parser.add_argument('--strip', action='store_true', help='also write <name>_walk.png strip + .json meta')
+    parser.add_argument('--profile', action='store_true', help='print per-stage timings for each sprite')
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='worker processes; only worth it for many or large sources (spawned workers re-import numpy/scipy/PIL)',
+    )
+    args = parser.parse_args()
+    png_opts = PNG_SHIP if args.ship else PNG_FAST
+
+    if args.style == 'legbob':
+        offsets, split = LEGBOB_OFFSETS, LEG_SPLIT
+    else:
+        offsets, split = OFFSETS, None
+
     ASSET_DIR.mkdir(parents=True, exist_ok=True)
+    jobs = []
     for name, path in SOURCES.items():
         if not path.exists():
             print('missing source', path)
             continue
-        sprite = prep_sprite(path)
-        compose_walk_frames(name, sprite)
+        jobs.append((name, path))
+    if not jobs:
+        return
+
+    run = partial(
+        process_one,
+        bg_mode=args.bg_mode,
+        offsets=offsets,
+        split=split,
+        png_opts=png_opts,
+        strip=args.strip,
+    )
+    workers = min(args.jobs, len(jobs), os.cpu_count() or 1)
+    if workers <= 1:
+        results = list(map(run, jobs))
+    else:
+        # sprites are independent; processes rather than threads since PIL holds the GIL in places
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(run, jobs))
+
+    if args.profile:
+        for name, timer in results:
+            timer.report(name)
 
 
 if __name__ == '__main__':
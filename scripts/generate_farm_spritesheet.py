@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import argparse
 import json
+from functools import lru_cache
 from pathlib import Path
 
-from PIL import Image, ImageDraw
+import numpy as np
+from PIL import Image
 
 
 TILE = 16
@@ -16,147 +19,154 @@ OUT_DIR = Path("public/static/assets/farm")
 PNG_PATH = OUT_DIR / "farm-spritesheet.png"
 META_PATH = OUT_DIR / "farm-spritesheet.json"
 
+# zlib level dominates runtime once painting is vectorized; --ship trades time for size
+PNG_FAST = {"compress_level": 1, "optimize": False}
+PNG_SHIP = {"compress_level": 9, "optimize": True}
 
-def p(img: Image.Image, x: int, y: int, color: tuple[int, int, int, int]) -> None:
-    if 0 <= x < img.width and 0 <= y < img.height:
-        img.putpixel((x, y), color)
+# per-pixel tile coordinates, shared by the patterned ground tiles
+TY, TX = np.indices((TILE, TILE))
 
 
-def r(draw: ImageDraw.ImageDraw, x: int, y: int, w: int, h: int, color: tuple[int, int, int, int]) -> None:
-    draw.rectangle((x, y, x + w - 1, y + h - 1), fill=color)
+def r(canvas: np.ndarray, x: int, y: int, w: int, h: int, color: tuple[int, int, int, int]) -> None:
+    canvas[y : y + h, x : x + w] = color
 
 
 def tile_xy(index: int) -> tuple[int, int]:
     return (index % COLS) * TILE, (index // COLS) * TILE
 
 
-def draw_grass_tile(img: Image.Image, draw: ImageDraw.ImageDraw, tx: int, ty: int, variant: int) -> None:
-    c1 = (164, 238, 125, 255)
-    c2 = (142, 225, 104, 255)
+@lru_cache(maxsize=None)
+def render_tile(painter, *args) -> np.ndarray:
+    # painters are pure functions of their args, so each archetype is painted once
+    tile = np.zeros((TILE, TILE, 4), np.uint8)
+    painter(tile, 0, 0, *args)
+    tile.flags.writeable = False
+    return tile
+
+
+def draw_grass_tile(canvas: np.ndarray, tx: int, ty: int, variant: int) -> None:
+    c1 = np.array((164, 238, 125, 255), np.uint8)
+    c2 = np.array((142, 225, 104, 255), np.uint8)
     c3 = (118, 204, 82, 255)
-    for y in range(TILE):
-        for x in range(TILE):
-            p(img, tx + x, ty + y, c1 if (x + y + variant) % 3 else c2)
-    for y in range(0, TILE, 4):
-        for x in range((y + variant) % 3, TILE, 3):
-            p(img, tx + x, ty + y, c3)
-    r(draw, tx, ty, TILE, 1, (178, 246, 147, 255))
-    r(draw, tx, ty + TILE - 1, TILE, 1, (108, 187, 77, 255))
+    tile = canvas[ty : ty + TILE, tx : tx + TILE]
+    tile[:] = np.where(((TX + TY + variant) % 3 != 0)[..., None], c1, c2)
+    tile[(TY % 4 == 0) & ((TX - TY - variant) % 3 == 0)] = c3
+    r(canvas, tx, ty, TILE, 1, (178, 246, 147, 255))
+    r(canvas, tx, ty + TILE - 1, TILE, 1, (108, 187, 77, 255))
 
 
-def draw_path_tile(img: Image.Image, draw: ImageDraw.ImageDraw, tx: int, ty: int) -> None:
+def draw_path_tile(canvas: np.ndarray, tx: int, ty: int) -> None:
     c1 = (236, 218, 141, 255)
     c2 = (227, 204, 121, 255)
     c3 = (216, 188, 100, 255)
-    r(draw, tx, ty, TILE, TILE, c1)
-    for y in range(0, TILE, 3):
-        for x in range((y // 3) % 2, TILE, 4):
-            p(img, tx + x, ty + y, c2)
-    for x, y in [(3, 4), (11, 5), (8, 10), (4, 13), (13, 12)]:
-        p(img, tx + x, ty + y, c3)
-    r(draw, tx, ty, TILE, 1, (243, 230, 168, 255))
-    r(draw, tx, ty + TILE - 1, TILE, 1, (202, 171, 92, 255))
+    tile = canvas[ty : ty + TILE, tx : tx + TILE]
+    tile[:] = c1
+    tile[(TY % 3 == 0) & ((TX - (TY // 3) % 2) % 4 == 0)] = c2
+    xs, ys = zip(*[(3, 4), (11, 5), (8, 10), (4, 13), (13, 12)])
+    tile[list(ys), list(xs)] = c3
+    r(canvas, tx, ty, TILE, 1, (243, 230, 168, 255))
+    r(canvas, tx, ty + TILE - 1, TILE, 1, (202, 171, 92, 255))
 
 
-def draw_soil_tile(img: Image.Image, draw: ImageDraw.ImageDraw, tx: int, ty: int) -> None:
+def draw_soil_tile(canvas: np.ndarray, tx: int, ty: int) -> None:
     base = (145, 95, 57, 255)
     line = (118, 73, 42, 255)
     high = (182, 129, 80, 255)
-    r(draw, tx, ty, TILE, TILE, base)
-    for y in (3, 7, 11):
-        r(draw, tx, ty + y, TILE, 1, line)
-    for x, y in [(2, 2), (6, 5), (10, 9), (13, 13), (4, 12)]:
-        p(img, tx + x, ty + y, high)
-    r(draw, tx, ty, TILE, 1, (201, 149, 99, 255))
-    r(draw, tx, ty + TILE - 1, TILE, 1, (97, 59, 33, 255))
+    tile = canvas[ty : ty + TILE, tx : tx + TILE]
+    tile[:] = base
+    tile[[3, 7, 11]] = line
+    xs, ys = zip(*[(2, 2), (6, 5), (10, 9), (13, 13), (4, 12)])
+    tile[list(ys), list(xs)] = high
+    r(canvas, tx, ty, TILE, 1, (201, 149, 99, 255))
+    r(canvas, tx, ty + TILE - 1, TILE, 1, (97, 59, 33, 255))
 
 
-def draw_fence_h(draw: ImageDraw.ImageDraw, tx: int, ty: int) -> None:
+def draw_fence_h(canvas: np.ndarray, tx: int, ty: int) -> None:
     dark = (131, 95, 58, 255)
     light = (174, 133, 86, 255)
-    r(draw, tx + 1, ty + 4, 14, 3, dark)
-    r(draw, tx + 1, ty + 9, 14, 3, dark)
-    r(draw, tx + 1, ty + 3, 14, 1, light)
-    r(draw, tx + 1, ty + 8, 14, 1, light)
-    r(draw, tx + 2, ty + 2, 2, 12, dark)
-    r(draw, tx + 12, ty + 2, 2, 12, dark)
-    r(draw, tx + 2, ty + 2, 1, 12, light)
-    r(draw, tx + 12, ty + 2, 1, 12, light)
+    r(canvas, tx + 1, ty + 4, 14, 3, dark)
+    r(canvas, tx + 1, ty + 9, 14, 3, dark)
+    r(canvas, tx + 1, ty + 3, 14, 1, light)
+    r(canvas, tx + 1, ty + 8, 14, 1, light)
+    r(canvas, tx + 2, ty + 2, 2, 12, dark)
+    r(canvas, tx + 12, ty + 2, 2, 12, dark)
+    r(canvas, tx + 2, ty + 2, 1, 12, light)
+    r(canvas, tx + 12, ty + 2, 1, 12, light)
 
 
-def draw_fence_v(draw: ImageDraw.ImageDraw, tx: int, ty: int) -> None:
+def draw_fence_v(canvas: np.ndarray, tx: int, ty: int) -> None:
     dark = (131, 95, 58, 255)
     light = (174, 133, 86, 255)
-    r(draw, tx + 4, ty + 1, 3, 14, dark)
-    r(draw, tx + 9, ty + 1, 3, 14, dark)
-    r(draw, tx + 3, ty + 1, 1, 14, light)
-    r(draw, tx + 8, ty + 1, 1, 14, light)
-    r(draw, tx + 2, ty + 2, 12, 2, dark)
-    r(draw, tx + 2, ty + 12, 12, 2, dark)
-    r(draw, tx + 2, ty + 2, 12, 1, light)
-    r(draw, tx + 2, ty + 12, 12, 1, light)
+    r(canvas, tx + 4, ty + 1, 3, 14, dark)
+    r(canvas, tx + 9, ty + 1, 3, 14, dark)
+    r(canvas, tx + 3, ty + 1, 1, 14, light)
+    r(canvas, tx + 8, ty + 1, 1, 14, light)
+    r(canvas, tx + 2, ty + 2, 12, 2, dark)
+    r(canvas, tx + 2, ty + 12, 12, 2, dark)
+    r(canvas, tx + 2, ty + 2, 12, 1, light)
+    r(canvas, tx + 2, ty + 12, 12, 1, light)
 
 
-def draw_rock_small(draw: ImageDraw.ImageDraw, tx: int, ty: int) -> None:
+def draw_rock_small(canvas: np.ndarray, tx: int, ty: int) -> None:
     dark = (117, 133, 151, 255)
     mid = (161, 177, 196, 255)
     hi = (221, 231, 240, 255)
-    r(draw, tx + 4, ty + 9, 8, 4, dark)
-    r(draw, tx + 3, ty + 10, 10, 3, mid)
-    r(draw, tx + 5, ty + 8, 6, 2, mid)
-    r(draw, tx + 6, ty + 8, 3, 1, hi)
+    r(canvas, tx + 4, ty + 9, 8, 4, dark)
+    r(canvas, tx + 3, ty + 10, 10, 3, mid)
+    r(canvas, tx + 5, ty + 8, 6, 2, mid)
+    r(canvas, tx + 6, ty + 8, 3, 1, hi)
 
 
-def draw_rock_big(draw: ImageDraw.ImageDraw, tx: int, ty: int) -> None:
+def draw_rock_big(canvas: np.ndarray, tx: int, ty: int) -> None:
     dark = (110, 125, 143, 255)
     mid = (153, 170, 190, 255)
     hi = (224, 233, 243, 255)
-    r(draw, tx + 2, ty + 8, 12, 6, dark)
-    r(draw, tx + 1, ty + 9, 14, 5, mid)
-    r(draw, tx + 4, ty + 6, 8, 3, mid)
-    r(draw, tx + 6, ty + 7, 4, 1, hi)
-    r(draw, tx + 4, ty + 12, 8, 1, dark)
+    r(canvas, tx + 2, ty + 8, 12, 6, dark)
+    r(canvas, tx + 1, ty + 9, 14, 5, mid)
+    r(canvas, tx + 4, ty + 6, 8, 3, mid)
+    r(canvas, tx + 6, ty + 7, 4, 1, hi)
+    r(canvas, tx + 4, ty + 12, 8, 1, dark)
 
 
-def draw_bush(draw: ImageDraw.ImageDraw, tx: int, ty: int) -> None:
+def draw_bush(canvas: np.ndarray, tx: int, ty: int) -> None:
     dark = (82, 145, 74, 255)
     mid = (107, 179, 93, 255)
     hi = (149, 219, 128, 255)
-    r(draw, tx + 4, ty + 5, 8, 8, dark)
-    r(draw, tx + 3, ty + 6, 10, 7, mid)
-    r(draw, tx + 5, ty + 4, 6, 3, mid)
-    r(draw, tx + 6, ty + 5, 3, 2, hi)
-    r(draw, tx + 8, ty + 8, 2, 1, hi)
+    r(canvas, tx + 4, ty + 5, 8, 8, dark)
+    r(canvas, tx + 3, ty + 6, 10, 7, mid)
+    r(canvas, tx + 5, ty + 4, 6, 3, mid)
+    r(canvas, tx + 6, ty + 5, 3, 2, hi)
+    r(canvas, tx + 8, ty + 8, 2, 1, hi)
 
 
-def draw_flower(draw: ImageDraw.ImageDraw, tx: int, ty: int, color: tuple[int, int, int, int]) -> None:
+def draw_flower(canvas: np.ndarray, tx: int, ty: int, color: tuple[int, int, int, int]) -> None:
     stem = (89, 144, 72, 255)
     center = (255, 228, 127, 255)
     hi = (255, 196, 216, 255) if color[0] > 200 else (255, 247, 214, 255)
-    r(draw, tx + 7, ty + 8, 2, 6, stem)
-    r(draw, tx + 6, ty + 9, 1, 2, (110, 171, 89, 255))
-    r(draw, tx + 9, ty + 9, 1, 2, (110, 171, 89, 255))
-    r(draw, tx + 6, ty + 5, 2, 2, color)
-    r(draw, tx + 8, ty + 5, 2, 2, color)
-    r(draw, tx + 7, ty + 4, 2, 2, color)
-    r(draw, tx + 7, ty + 6, 2, 2, color)
-    r(draw, tx + 7, ty + 5, 2, 2, center)
-    r(draw, tx + 7, ty + 4, 1, 1, hi)
-
-
-def draw_tuft(draw: ImageDraw.ImageDraw, tx: int, ty: int) -> None:
+    r(canvas, tx + 7, ty + 8, 2, 6, stem)
+    r(canvas, tx + 6, ty + 9, 1, 2, (110, 171, 89, 255))
+    r(canvas, tx + 9, ty + 9, 1, 2, (110, 171, 89, 255))
+    r(canvas, tx + 6, ty + 5, 2, 2, color)
+    r(canvas, tx + 8, ty + 5, 2, 2, color)
+    r(canvas, tx + 7, ty + 4, 2, 2, color)
+    r(canvas, tx + 7, ty + 6, 2, 2, color)
+    r(canvas, tx + 7, ty + 5, 2, 2, center)
+    r(canvas, tx + 7, ty + 4, 1, 1, hi)
+
+
+def draw_tuft(canvas: np.ndarray, tx: int, ty: int) -> None:
     d = (86, 145, 71, 255)
     m = (110, 184, 91, 255)
     h = (147, 220, 124, 255)
-    r(draw, tx + 7, ty + 7, 2, 8, d)
-    r(draw, tx + 5, ty + 9, 2, 6, m)
-    r(draw, tx + 9, ty + 9, 2, 6, m)
-    r(draw, tx + 4, ty + 12, 2, 3, h)
-    r(draw, tx + 10, ty + 12, 2, 3, h)
-    r(draw, tx + 7, ty + 6, 2, 1, h)
+    r(canvas, tx + 7, ty + 7, 2, 8, d)
+    r(canvas, tx + 5, ty + 9, 2, 6, m)
+    r(canvas, tx + 9, ty + 9, 2, 6, m)
+    r(canvas, tx + 4, ty + 12, 2, 3, h)
+    r(canvas, tx + 10, ty + 12, 2, 3, h)
+    r(canvas, tx + 7, ty + 6, 2, 1, h)
 
 
-def draw_seed(draw: ImageDraw.ImageDraw, tx: int, ty: int, kind: str) -> None:
+def draw_seed(canvas: np.ndarray, tx: int, ty: int, kind: str) -> None:
     stem = (84, 140, 68, 255)
     if kind == "wheat":
         crop = (246, 213, 99, 255)
@@ -168,60 +178,65 @@ def draw_seed(draw: ImageDraw.ImageDraw, tx: int, ty: int, kind: str) -> None:
         crop = (243, 142, 70, 255)
         hi = (255, 185, 127, 255)
 
-    r(draw, tx + 7, ty + 3, 2, 10, stem)
+    r(canvas, tx + 7, ty + 3, 2, 10, stem)
     if kind == "carrot":
-        r(draw, tx + 6, ty + 2, 1, 2, (126, 193, 100, 255))
-        r(draw, tx + 9, ty + 2, 1, 2, (126, 193, 100, 255))
-        r(draw, tx + 6, ty + 8, 4, 5, crop)
-        r(draw, tx + 7, ty + 13, 2, 1, (209, 102, 41, 255))
-        r(draw, tx + 6, ty + 8, 1, 5, hi)
+        r(canvas, tx + 6, ty + 2, 1, 2, (126, 193, 100, 255))
+        r(canvas, tx + 9, ty + 2, 1, 2, (126, 193, 100, 255))
+        r(canvas, tx + 6, ty + 8, 4, 5, crop)
+        r(canvas, tx + 7, ty + 13, 2, 1, (209, 102, 41, 255))
+        r(canvas, tx + 6, ty + 8, 1, 5, hi)
     elif kind == "corn":
-        r(draw, tx + 6, ty + 4, 4, 7, crop)
-        r(draw, tx + 5, ty + 5, 1, 5, (108, 171, 81, 255))
-        r(draw, tx + 10, ty + 5, 1, 5, (108, 171, 81, 255))
-        r(draw, tx + 6, ty + 4, 1, 7, hi)
+        r(canvas, tx + 6, ty + 4, 4, 7, crop)
+        r(canvas, tx + 5, ty + 5, 1, 5, (108, 171, 81, 255))
+        r(canvas, tx + 10, ty + 5, 1, 5, (108, 171, 81, 255))
+        r(canvas, tx + 6, ty + 4, 1, 7, hi)
     else:
-        r(draw, tx + 5, ty + 4, 2, 2, crop)
-        r(draw, tx + 9, ty + 5, 2, 2, crop)
-        r(draw, tx + 5, ty + 8, 2, 2, crop)
-        r(draw, tx + 9, ty + 9, 2, 2, crop)
-        r(draw, tx + 5, ty + 12, 2, 2, crop)
-        r(draw, tx + 9, ty + 13, 2, 2, crop)
-        r(draw, tx + 5, ty + 4, 1, 2, hi)
-        r(draw, tx + 9, ty + 5, 1, 2, hi)
+        r(canvas, tx + 5, ty + 4, 2, 2, crop)
+        r(canvas, tx + 9, ty + 5, 2, 2, crop)
+        r(canvas, tx + 5, ty + 8, 2, 2, crop)
+        r(canvas, tx + 9, ty + 9, 2, 2, crop)
+        r(canvas, tx + 5, ty + 12, 2, 2, crop)
+        r(canvas, tx + 9, ty + 13, 2, 2, crop)
+        r(canvas, tx + 5, ty + 4, 1, 2, hi)
+        r(canvas, tx + 9, ty + 5, 1, 2, hi)
 
 
-def draw() -> None:
+def draw(png_opts: dict[str, int | bool] = PNG_FAST) -> None:
     OUT_DIR.mkdir(parents=True, exist_ok=True)
-    img = Image.new("RGBA", (WIDTH, HEIGHT), (0, 0, 0, 0))
-    draw_ctx = ImageDraw.Draw(img)
+    # tile grid, flattened into the sheet with a single transpose + reshape at the end
+    tiles = np.zeros((ROWS, COLS, TILE, TILE, 4), np.uint8)
     meta: dict[str, dict[str, int]] = {}
 
-    def put(name: str, idx: int, painter) -> None:
+    def put(name: str, idx: int, painter, *args) -> None:
+        tiles[idx // COLS, idx % COLS] = render_tile(painter, *args)
         tx, ty = tile_xy(idx)
-        painter(tx, ty)
         meta[name] = {"x": tx, "y": ty, "w": TILE, "h": TILE}
 
-    put("grass_a", 0, lambda x, y: draw_grass_tile(img, draw_ctx, x, y, 0))
-    put("grass_b", 1, lambda x, y: draw_grass_tile(img, draw_ctx, x, y, 1))
-    put("grass_c", 2, lambda x, y: draw_grass_tile(img, draw_ctx, x, y, 2))
-    put("path", 3, lambda x, y: draw_path_tile(img, draw_ctx, x, y))
-    put("soil", 4, lambda x, y: draw_soil_tile(img, draw_ctx, x, y))
-    put("fence_h", 5, lambda x, y: draw_fence_h(draw_ctx, x, y))
-    put("fence_v", 6, lambda x, y: draw_fence_v(draw_ctx, x, y))
-    put("rock_small", 7, lambda x, y: draw_rock_small(draw_ctx, x, y))
-    put("rock_big", 8, lambda x, y: draw_rock_big(draw_ctx, x, y))
-    put("bush", 9, lambda x, y: draw_bush(draw_ctx, x, y))
-    put("flower_red", 10, lambda x, y: draw_flower(draw_ctx, x, y, (216, 95, 134, 255)))
-    put("flower_white", 11, lambda x, y: draw_flower(draw_ctx, x, y, (242, 244, 248, 255)))
-    put("tuft", 12, lambda x, y: draw_tuft(draw_ctx, x, y))
-    put("seed_wheat", 13, lambda x, y: draw_seed(draw_ctx, x, y, "wheat"))
-    put("seed_corn", 14, lambda x, y: draw_seed(draw_ctx, x, y, "corn"))
-    put("seed_carrot", 15, lambda x, y: draw_seed(draw_ctx, x, y, "carrot"))
-
-    img.save(PNG_PATH)
+    put("grass_a", 0, draw_grass_tile, 0)
+    put("grass_b", 1, draw_grass_tile, 1)
+    put("grass_c", 2, draw_grass_tile, 2)
+    put("path", 3, draw_path_tile)
+    put("soil", 4, draw_soil_tile)
+    put("fence_h", 5, draw_fence_h)
+    put("fence_v", 6, draw_fence_v)
+    put("rock_small", 7, draw_rock_small)
+    put("rock_big", 8, draw_rock_big)
+    put("bush", 9, draw_bush)
+    put("flower_red", 10, draw_flower, (216, 95, 134, 255))
+    put("flower_white", 11, draw_flower, (242, 244, 248, 255))
+    put("tuft", 12, draw_tuft)
+    put("seed_wheat", 13, draw_seed, "wheat")
+    put("seed_corn", 14, draw_seed, "corn")
+    put("seed_carrot", 15, draw_seed, "carrot")
+
+    sheet = tiles.transpose(0, 2, 1, 3, 4).reshape(HEIGHT, WIDTH, 4)
+    img = Image.fromarray(sheet, "RGBA")
+    img.save(PNG_PATH, **png_opts)
     META_PATH.write_text(json.dumps({"tile": TILE, "sprites": meta}, indent=2), encoding="utf-8")
 
 
 if __name__ == "__main__":
-    draw()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ship", action="store_true", help="max PNG compression for distribution")
+    args = parser.parse_args()
+    draw(PNG_SHIP if args.ship else PNG_FAST)